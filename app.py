@@ -1,49 +1,147 @@
 # app.py
 
-import pandas as pd
+import glob
+import hashlib
+import os
+import pickle
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, request, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import bindparam, event, false, func, insert, inspect, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, object_session
 
 # --- Configuration & Initialization ---
 app = Flask(__name__)
 XLSX_FILE_NAME = 'Fresh_10.12.2025.xlsx'
+RESULTS_PER_PAGE = 100
 
 # Database Configuration (SQLite)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventory.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Each threaded WSGI worker keeps its SQLite connections open between requests instead of reconnecting
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 10, 'max_overflow': 20}
 db = SQLAlchemy(app)
 
 
+# synchronous=NORMAL avoids a full fsync on every commit in WAL mode (set once per database file by
+# init_database()). Temp B-trees stay in memory, and each connection gets a 64MB page cache
+# and 256MB of memory-mapped reads.
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-65536')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+with app.app_context():
+    event.listen(db.engine, 'connect', _set_sqlite_pragma)
+
+
 # Add a thousands separator filter to Jinja2
 def thousands_separator(value):
     return f"{value:,}"
 
 
+# Display filter for serial numbers: upper-cased, with synthetic serials flagged clearly
+def display_serial(value, is_synthetic=False):
+    serial_display = value.upper() if value else ''
+    if is_synthetic:
+        serial_display = f"{serial_display} (Non-serialized)"
+    return serial_display
+
+
+# Title-cases with str.title(), as the dropdown lists do; Jinja's own title filter capitalises
+# differently (e.g. '2nd Floor' instead of '2Nd Floor')
+def title_case(value):
+    return value.title() if value else ''
+
+
 app.jinja_env.filters['thousands_separator'] = thousands_separator
+app.jinja_env.filters['display_serial'] = display_serial
+app.jinja_env.filters['title_case'] = title_case
 
 
 # --- Database Model Definition ---
 class Asset(db.Model):
+    # Searchable text columns use NOCASE so case-insensitive LIKE needs no LOWER() and prefix
+    # matches ('abc%') can be answered from the column indexes
     id = db.Column(db.Integer, primary_key=True)
-    asset_type = db.Column('Asset Type', db.String(100), nullable=False)
-    product = db.Column('Product', db.String(255))
-    name = db.Column('Name', db.String(255))
-    serial_number = db.Column('Serial Number', db.String(255), unique=True, nullable=True, index=True)
-    used_by_name = db.Column('Used by (Name)', db.String(255))
-    used_by_email = db.Column('Used by (Email)', db.String(255), index=True)
-    department = db.Column('Department', db.String(255))
-    location = db.Column('Location', db.String(255))
+    asset_type = db.Column('Asset Type', db.String(100, collation='NOCASE'), nullable=False, index=True)
+    product = db.Column('Product', db.String(255, collation='NOCASE'), index=True)
+    name = db.Column('Name', db.String(255, collation='NOCASE'), index=True)
+    serial_number = db.Column('Serial Number', db.String(255, collation='NOCASE'), unique=True, nullable=True, index=True)
+    used_by_name = db.Column('Used by (Name)', db.String(255, collation='NOCASE'), index=True)
+    used_by_email = db.Column('Used by (Email)', db.String(255, collation='NOCASE'), index=True)
+    department = db.Column('Department', db.String(255, collation='NOCASE'), index=True)
+    location = db.Column('Location', db.String(255, collation='NOCASE'), index=True)
+    # Set for consumables loaded without a serial, which get a generated SYNTHETIC_ serial instead
+    is_synthetic = db.Column('Is Synthetic', db.Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        # Partial index for "real assets only" listings, which skip the synthetic consumables
+        db.Index('ix_asset_serialized', 'id', sqlite_where=is_synthetic == false()),
+    )
+
+
+# --- Full-Text Search Index (SQLite FTS5) ---
+# External-content FTS5 table over every searchable (text) Asset column, kept in sync by triggers.
+# The trigram tokenizer gives case-insensitive substring matching, like the ILIKE '%query%' it replaces.
+SEARCH_COLUMNS = [column.name for column in Asset.__table__.columns if isinstance(column.type, db.String)]
+FTS_MIN_QUERY_LENGTH = 3  # Trigram matching needs at least three characters
+
+
+def _fts_column_list(prefix=''):
+    return ', '.join(f'{prefix}"{name}"' for name in SEARCH_COLUMNS)
+
+
+SEARCH_INDEX_DDL = [
+    f"CREATE VIRTUAL TABLE asset_fts USING fts5({_fts_column_list()}, "
+    f"content='asset', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER asset_fts_ai AFTER INSERT ON asset BEGIN "
+    f"INSERT INTO asset_fts(rowid, {_fts_column_list()}) VALUES (new.id, {_fts_column_list('new.')}); END",
+    f"CREATE TRIGGER asset_fts_ad AFTER DELETE ON asset BEGIN "
+    f"INSERT INTO asset_fts(asset_fts, rowid, {_fts_column_list()}) "
+    f"VALUES ('delete', old.id, {_fts_column_list('old.')}); END",
+    f"CREATE TRIGGER asset_fts_au AFTER UPDATE ON asset BEGIN "
+    f"INSERT INTO asset_fts(asset_fts, rowid, {_fts_column_list()}) "
+    f"VALUES ('delete', old.id, {_fts_column_list('old.')}); "
+    f"INSERT INTO asset_fts(rowid, {_fts_column_list()}) VALUES (new.id, {_fts_column_list('new.')}); END",
+]
+
+# Query-side handle on the virtual table (separate MetaData so db.create_all() never touches it)
+# (rank is FTS5's hidden BM25 relevance column; lower is more relevant)
+asset_fts = db.Table(
+    'asset_fts', db.MetaData(),
+    db.Column('rowid', db.Integer), db.Column('asset_fts', db.Text), db.Column('rank', db.Float)
+)
+
+
+def setup_search_index(connection):
+    """Creates the FTS5 search table and its sync triggers, indexing any existing assets on first creation."""
+    if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'asset_fts'")).first():
+        return
+
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO asset_fts(asset_fts) VALUES ('rebuild')"))
 
 
 # --- Utility: Helper function for cleaning column headers ---
+_CLEAN_COL_RE = re.compile(r'[^\w\s]')
+
+
 def clean_col_name(col):
     """Standardizes column names for consistent matching (e.g., 'Serial Number' -> 'serial_number')."""
     if isinstance(col, str):
         # Remove non-word/space chars, replace spaces with underscores, convert to lower case
-        cleaned = re.sub(r'[^\w\s]', '', col).strip().replace(' ', '_')
-        return cleaned.lower()
+        return _CLEAN_COL_RE.sub('', col).strip().replace(' ', '_').lower()
     return str(col).lower()
 
 
@@ -60,123 +158,287 @@ REVERSE_MAPPING = {
 }
 LOWERCASE_FIELDS = ['serial_number', 'asset_type', 'department', 'location', 'used_by_email']
 
+# Extra SQLite tuning applied before the initial load (~200MB page cache for the index rebuilds);
+# the remaining PRAGMAs are already set on every connection
+INGEST_PRAGMAS = [
+    'PRAGMA cache_size=-200000',
+]
+
+# Sheets parsed and cleaned ahead of the (single) database writer during the initial load
+INGEST_PARSE_WORKERS = 2
+
+# Rows per executemany during the initial load; large sheets are split so bind-parameter
+# buffers stay bounded, while the sheet's savepoint spans every batch
+INGEST_BATCH_SIZE = 10_000
+
+# Core INSERT used by the initial load, bypassing the ORM mapper. Binds are named after the model
+# attributes so the cleaned sheet records can be passed straight to a single executemany.
+INGEST_FIELDS = ['asset_type', *REVERSE_MAPPING, 'is_synthetic']
+ASSET_INGEST_INSERT = insert(Asset.__table__).values(
+    {getattr(Asset, field).expression: bindparam(field) for field in INGEST_FIELDS}
+)
+
+
+# Attempts at switching a database file to WAL while other processes hold it open
+WAL_SWITCH_ATTEMPTS = 10
+
+
+def _enable_wal(connection):
+    """
+    Switches the database file to WAL, which lets readers (index, search) proceed while add/edit commits
+    are being written. The mode is persistent, so this only changes anything once per file; the switch
+    fails with "database is locked" (without waiting) while another connection uses the file, so it is retried.
+    """
+    for attempt in range(1, WAL_SWITCH_ATTEMPTS + 1):
+        try:
+            if connection.execute(text('PRAGMA journal_mode')).scalar() != 'wal':
+                connection.execute(text('PRAGMA journal_mode=WAL'))
+            connection.commit()
+            return
+        except OperationalError as e:
+            connection.rollback()
+            if 'locked' not in str(e) or attempt == WAL_SWITCH_ATTEMPTS:
+                raise
+            time.sleep(0.05 * attempt)
+
+
+def init_database():
+    """Creates the tables, indexes and search index if they do not exist yet."""
+    with app.app_context(), db.engine.connect() as connection:
+        _enable_wal(connection)
+
+        # Every check-then-create below runs under SQLite's write lock, so workers starting together
+        # on a fresh database wait for the first one's schema instead of racing it
+        # (pysqlite does not emit BEGIN before DDL itself)
+        connection.execute(text('BEGIN IMMEDIATE'))
+        db.metadata.create_all(connection)
+        # create_all() never alters existing tables: add the is_synthetic flag to databases created before it,
+        # flagging the rows that already carry a generated serial. GLOB is case-sensitive (unlike LIKE on the
+        # NOCASE column), so lowercased user serials such as 'synthetic_x' are not mistaken for generated ones.
+        if 'Is Synthetic' not in {column['name'] for column in inspect(connection).get_columns('asset')}:
+            connection.execute(text('ALTER TABLE asset ADD COLUMN "Is Synthetic" BOOLEAN DEFAULT 0 NOT NULL'))
+            connection.execute(text(
+                """UPDATE asset SET "Is Synthetic" = 1 WHERE "Serial Number" GLOB 'SYNTHETIC_*'"""
+            ))
+        # create_all() only builds indexes with new tables; add any introduced since to existing databases
+        for index in Asset.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        setup_search_index(connection)
+        connection.commit()
+
+
+def _prepare_sheet_records(sheet_name):
+    """
+    Parses one worksheet and returns its cleaned rows as dicts keyed by INGEST_FIELDS,
+    or None if the sheet is empty. Runs in the ingest parser threads, so it never touches the database.
+    """
+    import pandas as pd
+
+    # CRUCIAL: Read all data as strings to prevent '0' issue
+    df = pd.read_excel(XLSX_FILE_NAME, sheet_name=sheet_name, engine='calamine', dtype=str)
+    if df.empty:
+        return None
+
+    # 1. Clean and standardize all column names
+    df.columns = [clean_col_name(col) for col in df.columns]
+
+    # 2. Drop irrelevant 'unnamed:' columns
+    unnamed_cols = [col for col in df.columns if col.startswith('unnamed')]
+    if unnamed_cols:
+        df = df.drop(columns=unnamed_cols)
+
+    # Headers that only differ in punctuation/whitespace (e.g. 'Name' and 'Name ') clean to the same name;
+    # keep the first so the projection below never sees duplicate labels
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    # 3. Build a dynamic column map for this specific sheet
+    sheet_map = {}
+    for model_attr, possible_cols in REVERSE_MAPPING.items():
+        for col in df.columns:
+            if col in possible_cols:
+                # Map the actual cleaned column name to the model attribute name
+                sheet_map[col] = model_attr
+                break
+
+    sheet_asset_type = sheet_name.lower().strip()
+
+    # 4. Project to the mapped columns renamed to model attributes, then clean column-wise:
+    #    strip whitespace, null out 'nan'/'none'/'' and lowercase the key fields
+    df = df[list(sheet_map)].rename(columns=sheet_map).reindex(columns=list(REVERSE_MAPPING))
+    df = df.apply(lambda s: s.astype('string').str.strip())
+    df = df.mask(df.apply(lambda s: s.str.lower()).isin(['nan', 'none', '']))
+    lower_cols = df.columns.intersection(LOWERCASE_FIELDS)
+    df[lower_cols] = df[lower_cols].apply(lambda s: s.str.lower())
+
+    # 5. FIX: Generate synthetic serial numbers where missing (for consumables), numbered by sheet row
+    synth_prefix = f"SYNTHETIC_{sheet_name.replace(' ', '_').upper()}_"
+    df['is_synthetic'] = df['serial_number'].isna()
+    df['serial_number'] = df['serial_number'].fillna(
+        pd.Series(synth_prefix + (df.index + 1).astype(str), index=df.index)
+    )
+
+    # asset_type is assigned as a column so sheets without any mapped column still yield rows
+    return (
+        df.astype(object).where(df.notna(), None)
+        .assign(asset_type=sheet_asset_type)
+        .to_dict(orient='records')
+    )
+
+
+def _sheet_result(future):
+    """Returns a parsed sheet's records, or the exception that made its parse fail."""
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def _iter_prepared_sheets(sheet_names):
+    """
+    Yields (sheet_name, records) in workbook order while the following sheets are parsed ahead
+    in a small thread pool. At most INGEST_PARSE_WORKERS + 1 sheets are held in memory at once,
+    and the caller stays the only SQLite writer. A sheet that failed to parse is yielded with
+    its exception in place of the records, so the caller can skip it and carry on.
+    """
+    with ThreadPoolExecutor(max_workers=INGEST_PARSE_WORKERS) as pool:
+        in_flight = deque()
+        for sheet_name in sheet_names:
+            in_flight.append((sheet_name, pool.submit(_prepare_sheet_records, sheet_name)))
+            if len(in_flight) > INGEST_PARSE_WORKERS:
+                name, future = in_flight.popleft()
+                yield name, _sheet_result(future)
+
+        for name, future in in_flight:
+            yield name, _sheet_result(future)
+
+
+# Parsed sheets are cached next to the workbook, keyed by its SHA-256, so reloading the same file
+# version (e.g. after deleting inventory.db) skips the XLSX parse entirely.
+# Bump XLSX_CACHE_VERSION whenever the prepared records change shape (e.g. a new INGEST_FIELDS entry).
+XLSX_CACHE_PREFIX = '.xlsx_cache_'
+XLSX_CACHE_VERSION = 2
+
+
+def _xlsx_cache_path():
+    digest = hashlib.sha256()
+    with open(XLSX_FILE_NAME, 'rb') as workbook_file:
+        for chunk in iter(lambda: workbook_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return f'{XLSX_CACHE_PREFIX}v{XLSX_CACHE_VERSION}_{digest.hexdigest()}.pkl'
+
+
+def _load_workbook_sheets():
+    """
+    Returns an iterable of (sheet_name, records) for every sheet of XLSX_FILE_NAME: the parse cache
+    when it matches the file's current contents, otherwise a generator that parses the workbook
+    and caches the result once it has been fully consumed.
+    """
+    cache_path = _xlsx_cache_path()
+    if os.path.exists(cache_path):
+        print(f"Using cached parse of '{XLSX_FILE_NAME}' ({cache_path}).")
+        with open(cache_path, 'rb') as cache_file:
+            return pickle.load(cache_file)
+
+    # The workbook changed (or was never parsed): caches of older versions, and any .tmp left by an
+    # interrupted dump, are no longer useful
+    for stale_cache in glob.glob(f'{XLSX_CACHE_PREFIX}*'):
+        os.remove(stale_cache)
+
+    # pandas is only needed to parse the workbook, so the web workers never import it
+    import pandas as pd
+
+    with pd.ExcelFile(XLSX_FILE_NAME, engine='calamine') as workbook:
+        sheet_names = [name for name in workbook.sheet_names if not name.lower().startswith('unnamed:')]
+
+    def parse_and_cache():
+        prepared_sheets = []
+        for sheet_name, records in _iter_prepared_sheets(sheet_names):
+            prepared_sheets.append((sheet_name, records))
+            yield sheet_name, records
+
+        # A failed sheet may parse on the next attempt, so only a complete parse is cached
+        if any(isinstance(records, Exception) for _, records in prepared_sheets):
+            return
+
+        # Written to a temporary file first so an interrupted dump never leaves a truncated cache behind
+        with open(f'{cache_path}.tmp', 'wb') as cache_file:
+            pickle.dump(prepared_sheets, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{cache_path}.tmp', cache_path)
+
+    return parse_and_cache()
+
 
 def setup_database_from_excel():
     """
     Initializes the database and populates it with data from the XLSX file,
-    using dynamic column mapping and committing per sheet for resilience.
+    using dynamic column mapping. Sheets are parsed in worker threads and inserted
+    in workbook order in a single transaction, with a savepoint per sheet so a bad
+    sheet is rolled back on its own.
     """
-    with app.app_context():
-        db.create_all()
+    init_database()
 
+    with app.app_context():
         if Asset.query.count() == 0:
             print(f"Database is empty. Populating from '{XLSX_FILE_NAME}'...")
             try:
-                # CRUCIAL: Read all data as strings to prevent '0' issue
-                all_sheets = pd.read_excel(
-                    XLSX_FILE_NAME,
-                    sheet_name=None,
-                    engine='openpyxl',
-                    dtype=str
-                )
-
+                workbook_sheets = _load_workbook_sheets()
                 records_added_total = 0
-                existing_serials = set(
-                    [s[0] for s in db.session.query(Asset.serial_number).filter(Asset.serial_number.isnot(None)).all()]
-                )
 
-                for sheet_name, df in all_sheets.items():
-
-                    if sheet_name.lower().startswith('unnamed:') or df.empty:
+                # Tune SQLite for the bulk load and open one explicit transaction for every sheet
+                # (pysqlite does not emit BEGIN itself, which the per-sheet SAVEPOINTs rely on)
+                for pragma in INGEST_PRAGMAS:
+                    db.session.execute(text(pragma))
+                db.session.execute(text('BEGIN'))
+
+                # The table is empty, so drop its indexes and build each one once after the load instead
+                # of updating every B-tree per row. Without the UNIQUE serial index, repeated serials are
+                # filtered here in workbook order (first occurrence wins).
+                for index in Asset.__table__.indexes:
+                    index.drop(db.session.connection())
+                ingested_serials = set()
+
+                for sheet_name, records in workbook_sheets:
+                    if records is None:
+                        continue
+                    if isinstance(records, Exception):
+                        print(f"FAILED to parse sheet '{sheet_name}'. Skipping it. Error: {records}")
                         continue
 
-                        # 1. Clean and standardize all column names
-                    df.columns = [clean_col_name(col) for col in df.columns]
-
-                    # 2. Drop irrelevant 'unnamed:' columns
-                    unnamed_cols = [col for col in df.columns if col.startswith('unnamed')]
-                    if unnamed_cols:
-                        df = df.drop(columns=unnamed_cols)
-
-                    # 3. Build a dynamic column map for this specific sheet
-                    sheet_map = {}
-                    for model_attr, possible_cols in REVERSE_MAPPING.items():
-                        for col in df.columns:
-                            if col in possible_cols:
-                                # Map the actual cleaned column name to the model attribute name
-                                sheet_map[col] = model_attr
-                                break
-
-                    sheet_records_added = 0
-                    sheet_asset_type = sheet_name.lower().strip()
+                    sheet_serials = set()
+                    unique_records = []
+                    for asset_data in records:
+                        serial_num = asset_data['serial_number']
+                        if serial_num not in ingested_serials and serial_num not in sheet_serials:
+                            sheet_serials.add(serial_num)
+                            unique_records.append(asset_data)
+                    records = unique_records
 
+                    sheet_savepoint = db.session.begin_nested()
                     try:
-                        # 4. Process rows for the current sheet
-                        for index, row in df.iterrows():
-
-                            # CRUCIAL FIX: Try-except block for individual rows
-                            try:
-                                asset_data = {'asset_type': sheet_asset_type}
-
-                                # Extract and clean data using the sheet-specific map
-                                for col_name, model_attr in sheet_map.items():
-                                    try:
-                                        value = str(row[col_name]).strip()
-                                    except KeyError:
-                                        continue
-                                    except Exception:
-                                        value = None
-
-                                    # Handle empty/null values
-                                    if value is None or value.lower() in ('nan', '', 'none', 'nan '):
-                                        value = None
-
-                                    # Enforce lowercase on key fields
-                                    if model_attr in LOWERCASE_FIELDS and value is not None:
-                                        value = value.lower()
-
-                                    asset_data[model_attr] = value
-
-                                serial_num = asset_data.get('serial_number')
-
-                                # FIX: Generate synthetic serial number if missing (for consumables)
-                                if serial_num is None:
-                                    sheet_prefix = sheet_name.replace(' ', '_').upper()
-                                    serial_num = f"SYNTHETIC_{sheet_prefix}_{index + 1}"
-                                    asset_data['serial_number'] = serial_num
-
-                                # Check if the serial (real or synthetic) is already known
-                                if serial_num in existing_serials:
-                                    continue  # Skip if already seen
-
-                                # Add to session
-                                new_asset = Asset(**asset_data)
-                                db.session.add(new_asset)
-                                existing_serials.add(serial_num)
-                                sheet_records_added += 1
-
-                            except Exception as row_e:
-                                # This row failed to process, log it and continue to the next row
-                                print(
-                                    f"Warning: Skipping row {index + 2} in sheet '{sheet_name}' due to error: {row_e}")
-
-                        # 5. COMMIT THE CURRENT SHEET'S DATA
-                        db.session.commit()
+                        # 6. BULK INSERT THE CURRENT SHEET'S DATA IN BATCHES AND RELEASE ITS SAVEPOINT
+                        sheet_records_added = 0
+                        for batch_start in range(0, len(records), INGEST_BATCH_SIZE):
+                            batch = records[batch_start:batch_start + INGEST_BATCH_SIZE]
+                            sheet_records_added += db.session.execute(ASSET_INGEST_INSERT, batch).rowcount
+                        sheet_savepoint.commit()
+                        ingested_serials.update(sheet_serials)
                         records_added_total += sheet_records_added
                         print(f"Successfully loaded {sheet_records_added} assets from sheet: '{sheet_name}'.")
 
-                    # Catch sheet-level database errors (should only be IntegrityError now)
-                    except IntegrityError as e:
-                        db.session.rollback()
-                        print(
-                            f"FAILED to load sheet '{sheet_name}' due to IntegrityError (duplicate serials). Rolling back sheet changes. Error: {e}")
-
-                    # Catch any remaining unexpected error during sheet processing
+                    # Serials are de-duplicated above and the UNIQUE index is dropped for the load,
+                    # so any error here is unexpected; only this sheet's rows are rolled back
                     except Exception as e:
-                        db.session.rollback()
+                        sheet_savepoint.rollback()
                         print(
                             f"FAILED to load sheet '{sheet_name}' due to UNEXPECTED error. Rolling back sheet changes. Error: {e}")
 
+                # 7. REBUILD THE INDEXES AND COMMIT ALL SHEETS AT ONCE (a single fsync for the whole ingest)
+                for index in Asset.__table__.indexes:
+                    index.create(db.session.connection())
+                db.session.commit()
+                # Core inserts bypass the mapper events that keep these caches fresh
+                clear_unique_cache()
+                clear_asset_count()
                 print(f"Total unique assets added to the database: {records_added_total}.")
 
             except FileNotFoundError:
@@ -187,127 +449,215 @@ def setup_database_from_excel():
 
 
 # --- Utility Function: Search and Fetch from DB ---
-def get_assets(query=None):
-    """Fetches assets from the database based on a search query."""
+# Columns rendered by the results table. They are selected as plain rows (attribute access by model
+# attribute name, e.g. row.serial_number) so listings skip Asset instance construction and the identity map.
+LISTING_COLUMNS = [
+    Asset.id, Asset.asset_type, Asset.product, Asset.name, Asset.serial_number,
+    Asset.used_by_name, Asset.used_by_email, Asset.department, Asset.location, Asset.is_synthetic,
+]
+
+
+def _uses_search_index(query, starts_with=False):
+    """
+    Substring queries long enough for the trigram index are answered by FTS5; the rest use LIKE.
+    The FTS5 query parser stops reading at a NUL character, so queries containing one use LIKE too.
+    """
+    return not starts_with and len(query) >= FTS_MIN_QUERY_LENGTH and '\x00' not in query
+
+
+def _filter_by_search(assets_query, query, starts_with=False):
+    """Restricts a select() over Asset to the assets matching query."""
+    if _uses_search_index(query, starts_with):
+        # Quote the whole query as one FTS5 string so it is matched as a literal substring
+        phrase = '"' + query.replace('"', '""') + '"'
+        return assets_query.join(asset_fts, asset_fts.c.rowid == Asset.id).where(
+            asset_fts.c.asset_fts.match(phrase)
+        )
+
+    # Substring queries too short for the trigram index fall back to LIKE '%query%' (a table scan);
+    # "starts with" searches use LIKE 'query%', which the NOCASE column indexes can answer
+    search = f"{query}%" if starts_with else f"%{query}%"
+
+    # Matching ids come from a subquery so SQLite can answer a prefix search with a MULTI-INDEX OR over
+    # the column indexes; inline, the ORDER BY id LIMIT in get_assets makes it scan the table in rowid order
+    matching_ids = select(Asset.id).where(
+        db.or_(
+            Asset.asset_type.like(search),
+            Asset.product.like(search),
+            Asset.name.like(search),
+            Asset.serial_number.like(search),
+            Asset.used_by_name.like(search),
+            Asset.used_by_email.like(search),
+            Asset.department.like(search),
+            Asset.location.like(search)
+        )
+    )
+    return assets_query.where(Asset.id.in_(matching_ids))
+
+
+def get_assets(query=None, limit=RESULTS_PER_PAGE, offset=0, starts_with=False):
+    """
+    Fetches one page of asset rows from the database, optionally filtered by a search query.
+    The query matches anywhere in a field, or only at its start when starts_with is set.
+    """
+    assets_query = select(*LISTING_COLUMNS)
+
     if query:
-        search = f"%{query.lower()}%"
-
-        return db.session.query(Asset).filter(
-            db.or_(
-                Asset.asset_type.ilike(search),
-                Asset.product.ilike(search),
-                Asset.name.ilike(search),
-                Asset.serial_number.ilike(search),
-                Asset.used_by_name.ilike(search),
-                Asset.used_by_email.ilike(search),
-                Asset.department.ilike(search),
-                Asset.location.ilike(search)
-            )
-        ).all()
+        assets_query = _filter_by_search(assets_query, query, starts_with)
+        if _uses_search_index(query, starts_with):
+            assets_query = assets_query.order_by(asset_fts.c.rank)
+
+    # Only the rendered page is fetched from the database (id keeps paging stable between equal ranks)
+    return db.session.execute(assets_query.order_by(Asset.id).limit(limit).offset(offset)).all()
+
+
+def count_matching_assets(query, starts_with=False):
+    """Returns the number of assets matching a search query, using the same filter as get_assets."""
+    return db.session.scalar(_filter_by_search(select(func.count()).select_from(Asset), query, starts_with))
+
+
+# --- Cache invalidation ---
+# Mapper events fire at flush, before the write is committed, so they only note which caches to clear;
+# the caches are cleared once the session's transaction commits, so a concurrent request cannot
+# re-fill them with pre-commit data in between.
+def _clear_cache_on_commit(target, clear_cache):
+    object_session(target).info.setdefault('caches_to_clear', set()).add(clear_cache)
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_caches_after_commit(session):
+    for clear_cache in session.info.pop('caches_to_clear', ()):
+        clear_cache()
+
 
-    return Asset.query.all()
+@event.listens_for(Session, 'after_rollback')
+def _discard_caches_to_clear(session):
+    session.info.pop('caches_to_clear', None)
+
+
+# The total asset count only changes on insert or delete, so it is cached per process and recounted
+# after either is committed; it also expires after ASSET_COUNT_CACHE_TTL seconds to pick up
+# inserts made by other worker processes.
+ASSET_COUNT_CACHE_TTL = 5
+_asset_count_cache = {'count': None}
+
+
+def clear_asset_count():
+    """Drops the cached asset count so the next request recounts the table."""
+    _asset_count_cache['count'] = None
+
+
+@event.listens_for(Asset, 'after_insert')
+@event.listens_for(Asset, 'after_delete')
+def _invalidate_asset_count(mapper, connection, target):
+    _clear_cache_on_commit(target, clear_asset_count)
+
+
+def get_total_asset_count():
+    """Returns the total number of assets, from the cache when possible."""
+    cached = _asset_count_cache['count']
+    if cached is None or time.monotonic() - cached[0] > ASSET_COUNT_CACHE_TTL:
+        cached = _asset_count_cache['count'] = (time.monotonic(), Asset.query.count())
+
+    return cached[1]
 
 
 # --- Flask Routes (UPDATED) ---
 @app.route('/', methods=['GET'])
 def index():
     search_query = request.args.get('query', '').strip()
+    starts_with = request.args.get('starts_with') == '1'
+    page = max(request.args.get('page', 1, type=int), 1)
 
-    total_assets_count = Asset.query.count()
-
-    assets = get_assets(search_query)
-    result_count = len(assets)
-
-    if assets:
-        data_dicts = []
-        for asset in assets:
-
-            # Use .title() for display to capitalize words
-            asset_type_display = asset.asset_type.title() if asset.asset_type else ''
-            department_display = asset.department.title() if asset.department else ''
-            location_display = asset.location.title() if asset.location else ''
-
-            # Display synthetic serials clearly
-            serial_display = asset.serial_number.upper() if asset.serial_number else ''
-            if serial_display.startswith("SYNTHETIC_"):
-                serial_display = f"{serial_display} (Non-serialized)"
-
-            # --- NEW: Create the Edit Link ---
-            edit_link = f'<a href="{url_for("edit_asset", asset_id=asset.id)}" class="btn btn-sm btn-primary">Edit</a>'
-
-            data_dicts.append({
-                'ID': asset.id,  # Include ID for debugging/reference
-                'Asset Type': asset_type_display,
-                'Product': asset.product or '',
-                'Name': asset.name or '',
-                'Serial Number': serial_display,
-                'Used by (Name)': asset.used_by_name or '',
-                'Used by (Email)': asset.used_by_email or '',
-                'Department': department_display,
-                'Location': location_display,
-                'Actions': edit_link  # NEW COLUMN
-            })
-
-        results_df = pd.DataFrame(data_dicts).fillna('')
-
-        results_html = results_df.head(100).to_html(
-            classes='table table-striped table-hover table-bordered',
-            index=False,
-            escape=False, # <--- THIS IS THE CRITICAL FIX: Stops Pandas from escaping the HTML button code
-            border=0,
-        )
+    # Searches report their own match count; the (cached) inventory total is only needed without one
+    if search_query:
+        result_count = count_matching_assets(search_query, starts_with)
     else:
-        results_html = f"<p class='alert alert-info'>No results found for **{search_query}**.</p>" if search_query else "<p class='alert alert-secondary'>Database is ready. Please use the search bar above.</p>"
+        result_count = get_total_asset_count()
+
+    # One row past the page tells whether a next page exists without counting the matches
+    assets = get_assets(
+        search_query, limit=RESULTS_PER_PAGE + 1, offset=(page - 1) * RESULTS_PER_PAGE, starts_with=starts_with
+    )
+    has_next_page = len(assets) > RESULTS_PER_PAGE
+    assets = assets[:RESULTS_PER_PAGE]
 
     message = request.args.get('message')
 
     return render_template(
         'index.html',
-        results_html=results_html,
+        assets=assets,
         query=search_query,
-        result_count=total_assets_count,
+        starts_with=starts_with,
+        result_count=result_count,
+        page=page,
+        has_next_page=has_next_page,
         message=message
     )
 
 
 # --- Utility Functions for Dropdowns ---
-def get_unique_asset_types():
-    """Fetches a sorted list of unique asset types from the database."""
-    unique_types = db.session.query(Asset.asset_type).distinct().all()
+# Dropdown values only change when assets are written, so they are cached per process
+# and invalidated whenever an Asset insert, update or delete is committed. Entries also expire
+# after UNIQUE_CACHE_TTL seconds to pick up writes made by other processes.
+UNIQUE_CACHE_TTL = 60
+_unique_cache = {'asset_types': None, 'departments': None, 'locations': None}
 
-    clean_types = sorted([
-        t[0].title()
-        for t in unique_types
-        if t[0] is not None and t[0].strip() != ''
-    ])
 
-    return clean_types
+def clear_unique_cache():
+    """Drops the cached dropdown lists so the next request reloads them from the database."""
+    for key in _unique_cache:
+        _unique_cache[key] = None
 
 
-def get_unique_departments():
-    """Fetches a sorted list of unique departments from the database."""
-    unique_depts = db.session.query(Asset.department).distinct().all()
+@event.listens_for(Asset, 'after_insert')
+@event.listens_for(Asset, 'after_delete')
+def _invalidate_unique_cache(mapper, connection, target):
+    _clear_cache_on_commit(target, clear_unique_cache)
 
-    clean_depts = sorted([
-        d[0].title()
-        for d in unique_depts
-        if d[0] is not None and d[0].strip() != ''
-    ])
 
-    return clean_depts
+@event.listens_for(Asset, 'after_update')
+def _invalidate_unique_cache_on_update(mapper, connection, target):
+    # after_update fires for every dirty instance, even when no column actually changed and no UPDATE
+    # is emitted (e.g. re-saving an unchanged edit form)
+    if object_session(target).is_modified(target, include_collections=False):
+        _clear_cache_on_commit(target, clear_unique_cache)
 
 
-def get_unique_locations():
-    """Fetches a sorted list of unique locations from the database."""
-    unique_locs = db.session.query(Asset.location).distinct().all()
+def _fetch_unique_values(column):
+    """Returns the distinct non-empty values of a column, sorted and title-cased for display."""
+    return [
+        value.title()
+        for value in db.session.scalars(
+            select(column).distinct()
+            .where(column.isnot(None), func.trim(column) != '')
+            .order_by(column)
+        )
+    ]
+
+
+def _cached_unique_values(key, column):
+    """Returns the cached dropdown list for key, reloading it when cleared or expired."""
+    cached = _unique_cache[key]
+    if cached is None or time.monotonic() - cached[0] > UNIQUE_CACHE_TTL:
+        cached = _unique_cache[key] = (time.monotonic(), _fetch_unique_values(column))
+
+    return cached[1]
 
-    clean_locs = sorted([
-        l[0].title()
-        for l in unique_locs
-        if l[0] is not None and l[0].strip() != ''
-    ])
 
-    return clean_locs
+def get_unique_asset_types():
+    """Fetches a sorted list of unique asset types, from the cache when possible."""
+    return _cached_unique_values('asset_types', Asset.asset_type)
+
+
+def get_unique_departments():
+    """Fetches a sorted list of unique departments, from the cache when possible."""
+    return _cached_unique_values('departments', Asset.department)
+
+
+def get_unique_locations():
+    """Fetches a sorted list of unique locations, from the cache when possible."""
+    return _cached_unique_values('locations', Asset.location)
 
 
 # --- Flask Routes (UPDATED ADD ASSET ROUTE with Dropdowns and Location Fix) ---
@@ -432,15 +782,18 @@ def edit_asset(asset_id):
                         f"Serial Number '{new_serial.upper()}' already belongs to another asset. Please check inventory.")
 
             # --- 3. Update Asset Fields ---
+            # Blank inputs are stored as NULL like the other optional fields, so re-saving an unchanged
+            # asset loaded with empty cells does not turn NULL into '' (SQLAlchemy only emits an UPDATE
+            # for attributes whose value actually changed)
             asset.asset_type = request.form['asset_type'].lower().strip()
-            asset.product = request.form.get('product')
-            asset.name = request.form.get('name')
+            asset.product = request.form.get('product') or None
+            asset.name = request.form.get('name') or None
 
             # Only update serial if it's not synthetic
-            if not asset.serial_number.startswith("SYNTHETIC_"):
+            if not asset.is_synthetic:
                 asset.serial_number = new_serial
 
-            asset.used_by_name = request.form.get('used_by_name')
+            asset.used_by_name = request.form.get('used_by_name') or None
             asset.used_by_email = request.form.get('used_by_email', '').lower().strip() or None
             asset.department = request.form.get('department', '').lower().strip() or None
             asset.location = location_value  # Use the resolved value
@@ -469,6 +822,15 @@ def edit_asset(asset_id):
             # GET request: Render the form with current data
     return render_template('edit_asset.html', **template_data)
 
-if __name__ == '__main__':
+@app.cli.command('load-inventory')
+def load_inventory_command():
+    """Creates the database and populates it from the inventory XLSX file if it is empty."""
     setup_database_from_excel()
+
+
+if __name__ == '__main__':
+    # Development server only; in production serve wsgi:application with gunicorn or waitress.
+    # Only the schema is created here so the server starts immediately.
+    # Populate the inventory once with: flask --app app load-inventory
+    init_database()
     app.run(debug=True)
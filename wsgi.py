@@ -0,0 +1,17 @@
+# wsgi.py
+#
+# Production entry point. Serve with a multi-threaded WSGI server instead of the Flask dev server, e.g.:
+#   gunicorn -w 4 -k gthread --threads 8 wsgi:application
+#   waitress-serve --threads=8 wsgi:application
+# The inventory itself is still loaded once with: flask --app app load-inventory
+
+from app import app, db, init_database
+
+# Create any missing schema; init_database() holds SQLite's write lock while it does, so workers
+# importing this module at the same time just wait for each other. The pooled connection it used is
+# dropped so that, when imported in a gunicorn master (--preload), forked workers never share it.
+init_database()
+with app.app_context():
+    db.engine.dispose()
+
+application = app